@@ -37,6 +37,9 @@ Functions:
     bank(self, transaction_ref: str = None) -> dict:
         Generates bank details for a transaction, allowing customers to complete payment via transfer.
 
+    verify_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        Verifies many transactions concurrently over the shared session (also `details_batch`, `status_batch`).
+
     card(self, cardDetails: dict, browserDetails: dict, ipAddress: str = None, transaction_ref: str = None) -> dict:
         Processes a card transaction using card details, browser details, and optional IP address.
 
@@ -74,10 +77,10 @@ Learn more: https://github.com/devfemibadmus/ercaspay
 from .utility import *
 from .main import Ercaspay
 
-import argparse
-
 
 def function():
+    import argparse
+
     parser = argparse.ArgumentParser(description="Bank operations")
     parser.add_argument("--bank", nargs="?", const="list", type=str, help="List all banks or check if a specific bank is supported")
     args = parser.parse_args()
@@ -2,6 +2,7 @@ from django.contrib import admin
 from .models import Transaction
 from django.contrib import messages
 from .django import ercaspay
+from .utility import response_body
 
 def cancel_transaction(modeladmin, request, queryset):
     for transaction in queryset:
@@ -17,11 +18,10 @@ def cancel_transaction(modeladmin, request, queryset):
 def update_status(modeladmin, request, queryset):
     for transaction in queryset:
         response = ercaspay.status(transaction.ercaspay_reference)
-        # print(response)
         if response.get('errorCode'):
             messages.error(request, f"Transaction {transaction.full_name} {response.get('explanation')}.")
         else:
-            status = response.get('responseBody', {}).get('status', transaction.status)
+            status = response_body(response, 'status', transaction.status)
             transaction.status = status
             transaction.save()
             messages.success(request, f"Transaction {transaction.full_name} status has been updated.")
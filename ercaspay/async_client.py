@@ -0,0 +1,218 @@
+import asyncio, logging, httpx
+from .main import Ercaspay
+from .utility import *
+from .utility import _dumps, _loads, _cached_bank_list, _store_bank_list
+
+
+class AsyncErcaspay(Ercaspay):
+    """
+    Asyncio version of `Ercaspay` built on `httpx.AsyncClient`.
+
+    Every API method is a coroutine with the same arguments and return value as its `Ercaspay` counterpart,
+    so many verifications can be in flight on one event loop over a single HTTP/2 connection pool.
+    Requires `pip install ercaspay[async]`. A custom `httpx.AsyncClient` can be passed as `session`, it is used as is and never modified.
+
+    Example:
+        ```python
+        async with AsyncErcaspay(env=".env") as ercaspay:
+            response = await ercaspay.verify(transaction_ref)
+        ```
+    """
+    def _make_transport(self, session: httpx.AsyncClient = None):
+        headers = {"Accept": "application/json", "Content-Type": "application/json", **self.headers}
+        self._owns_session = session is None
+        if session is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                timeout=httpx.Timeout(request_timeout[1], connect=request_timeout[0]),
+                headers=headers,
+            )
+            self._request_headers = None
+        else:
+            # left unmodified like an injected requests.Session, see Ercaspay._make_transport
+            self._client = session
+            self._request_headers = headers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Closes the connection pool of the client this instance created, an injected client is left open.
+        """
+        if self._owns_session:
+            await self._client.aclose()
+
+    async def _send(self, url: str, payload: dict) -> dict:
+        # same contract as utility.send_payment_request
+        try:
+            if not payload:
+                response = await self._client.get(url, headers=self._request_headers)
+            else:
+                response = await self._client.post(url, content=_dumps(payload), headers=self._request_headers)
+            try:
+                body = _loads(response.content)
+            except ValueError:
+                body = {}
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s %s -> %s %r", response.request.method, url, response.status_code, body)
+            if response.status_code in success_codes:
+                return body
+            return handle_error_msg(response.status_code, body)
+        except httpx.HTTPError as e:
+            return {'errorCode': 503, 'message': 'Error sending request', 'explanation': str(e)}
+
+    async def initiate(self, amount: float, customerName: str,
+        customerEmail: str, paymentReference: str, paymentMethods: str = None,
+        customerPhoneNumber: str = None, redirectUrl: str = None,
+        description: str = None, metadata: str = None,
+        feeBearer: str = None, currency: str = "NGN") -> dict:
+        """
+        Initiates a payment transaction on the Ercaspay platform. See `Ercaspay.initiate`.
+        """
+        error = validate_initiate(amount, customerName, customerEmail, paymentReference)
+        if error:
+            self.transaction_ref = None # like a failed api call, so later calls do not reuse the previous transaction
+            return handle_error_msg(422, {'errorMessage': error})
+        payload = self._initiate_payload(amount, customerName, customerEmail, paymentReference, paymentMethods,
+            customerPhoneNumber, redirectUrl, description, metadata, feeBearer, currency)
+        transaction = await self._send(initiateUrl, payload)
+        self.transaction_ref = response_body(transaction, 'transactionReference')
+        self._remember_amount(self.transaction_ref, amount)
+        return transaction
+
+    async def cancel(self, transaction_ref: str = None) -> dict:
+        """
+        Cancels an ongoing or scheduled transaction on Ercaspay. See `Ercaspay.cancel`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        self._details_cache.pop(transaction_ref, None)
+        return await self._send(self._urls['cancel'] + transaction_ref, {})
+
+    async def verify(self, transaction_ref: str = None) -> dict:
+        """
+        Verifies the status of a transaction using its reference. See `Ercaspay.verify`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        response = await self._send(self._urls['verify'] + transaction_ref, {})
+        self._remember_amount(transaction_ref, response_body(response, 'amount'))
+        return response
+
+    async def details(self, transaction_ref: str = None) -> dict:
+        """
+        Retrieves detailed information about a specific transaction. See `Ercaspay.details`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        response = self._cached_details(transaction_ref)
+        if response is None:
+            response = self._store_details(transaction_ref, await self._send(self._urls['details'] + transaction_ref, {}))
+        self._remember_amount(transaction_ref, response_body(response, 'amount'))
+        return response
+
+    async def status(self, transaction_ref: str = None, reference: str = None, payment_method: str = None) -> dict:
+        """
+        Checks the payment status of a specific transaction. See `Ercaspay.status`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        payload = self._status_payload(reference, payment_method)
+        return await self._send(self._urls['status'] + transaction_ref, payload)
+
+    async def _batch(self, method, transaction_refs: list, max_workers: int) -> dict:
+        if max_workers < 1:
+            # a Semaphore(0) would never let a request through
+            raise ValueError("max_workers must be greater than 0")
+        transaction_refs = list(dict.fromkeys(transaction_refs))
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run(transaction_ref):
+            async with semaphore:
+                return await method(transaction_ref)
+
+        return dict(zip(transaction_refs, await asyncio.gather(*(run(ref) for ref in transaction_refs))))
+
+    async def verify_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        """
+        Verifies many transactions concurrently. See `Ercaspay.verify_batch`.
+        """
+        return await self._batch(self.verify, transaction_refs, max_workers)
+
+    async def details_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        """
+        Retrieves details for many transactions concurrently. See `Ercaspay.details_batch`.
+        """
+        return await self._batch(self.details, transaction_refs, max_workers)
+
+    async def status_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        """
+        Checks the status of many transactions concurrently. See `Ercaspay.status_batch`.
+        """
+        return await self._batch(self.status, transaction_refs, max_workers)
+
+    async def ussd(self, bank_name: str, transaction_ref: str = None, amount: float=None) -> dict:
+        """
+        Generates a USSD code for a transaction. See `Ercaspay.ussd`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        if amount is None:
+            amount = self._amount_cache.get(transaction_ref)
+        if amount is None:
+            transaction = await self.details(transaction_ref)
+            amount = response_body(transaction, 'amount')
+            if not amount:
+                return transaction
+        payload = {
+            "amount": amount,
+            "bank_name": bank_name,
+        }
+        return await self._send(self._urls['ussd'] + transaction_ref, payload)
+
+    async def supported_bank_list(self) -> dict:
+        """
+        Get all the supported banks for USSD transfer
+        """
+        return _cached_bank_list() or _store_bank_list(await self._send(f"{ussdUrl}/supported-banks", {}))
+
+    async def support_bank(self, bank_name: str) -> bool:
+        """
+        Check if a bank is supported for USSD transfer
+        """
+        supported_bank_list = await self.supported_bank_list()
+        return bank_name.lower() in {bank.lower() for bank in supported_bank_list.get('responseBody', [])}
+
+    async def bank(self, transaction_ref: str = None) -> dict:
+        """
+        Generates a bank detail for a transaction. See `Ercaspay.bank`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        return await self._send(self._urls['bank'] + transaction_ref, {})
+
+    async def card(self, cardDetails: dict, browserDetails: dict, ipAddress: str = None, transaction_ref: str = None) -> dict:
+        """
+        Processes a card transaction. See `Ercaspay.card`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        # key loading and RSA encryption run off the event loop so other requests keep flowing
+        payload = await asyncio.to_thread(self._card_payload, cardDetails, browserDetails, ipAddress, transaction_ref)
+        response = await self._send(cardUrl, payload)
+        self.gatewayReference = response_body(response, 'gatewayReference')
+        return response
+
+    async def resend_otp(self, transaction_ref: str = None, gatewayReference: str = None) -> dict:
+        """
+        Resends an OTP for a specific transaction. See `Ercaspay.resend_otp`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        gatewayReference = get_gateway_ref(gatewayReference, self.gatewayReference)
+        return await self._send(self._urls['resend_otp'] + transaction_ref, {'gatewayReference': gatewayReference, 'amount': '100050'})
+
+    async def submit_otp(self, otp: str, transaction_ref: str = None, gatewayReference: str = None) -> dict:
+        """
+        Submits an OTP for a specific transaction. See `Ercaspay.submit_otp`.
+        """
+        transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        gatewayReference = get_gateway_ref(gatewayReference, self.gatewayReference)
+        return await self._send(self._urls['submit_otp'] + transaction_ref, {'gatewayReference': gatewayReference, 'otp': otp})
@@ -1,9 +1,9 @@
-import datetime, uuid
 from django.shortcuts import render, redirect
 from django.http import HttpResponse, Http404
 from .models import Transaction
 from django.conf import settings
 from .main import Ercaspay
+from .utility import generate_payment_reference, response_body
 
 DEFAULTS = {
     "ENV": None,
@@ -21,31 +21,28 @@ DEFAULTS = {
 ERCASPAY_SETTINGS = {**DEFAULTS, **getattr(settings, "ERCASPAY", {})}
 ercaspay = Ercaspay(ERCASPAY_SETTINGS['RSA_KEY'], ERCASPAY_SETTINGS['ENV'], ERCASPAY_SETTINGS['TOKEN'])
 website = {'name': ERCASPAY_SETTINGS['PAYMENT_PAGE_NAME'], 'description': ERCASPAY_SETTINGS['PAYMENT_PAGE_DESC'], 'no_phone': ERCASPAY_SETTINGS['NO_PHONE']}
+required_fields = ('first_name', 'last_name', 'email', 'amount') + (() if website['no_phone'] else ('phone_number',))
 
 def payment_page(request):
     if request.method == "POST":
-        first_name = request.POST.get('first_name')
-        last_name = request.POST.get('last_name')
-        full_name = f'{first_name} {last_name}'
-        email = request.POST.get('email')
-        amount = request.POST.get('amount')
-        required_fields = ['first_name', 'last_name', 'email', 'amount']
-        phone_number = request.POST.get('phone_number', None)
-        if not website['no_phone']:
-            required_fields.append('phone_number')
-        if not all(request.POST.get(field) for field in required_fields):
+        form = request.POST
+        values = [form.get(field) for field in required_fields]
+        if not all(values):
             return HttpResponse("Missing fields", status=400)
+        first_name, last_name, email, amount = values[:4]
+        phone_number = form.get('phone_number', None)
+        full_name = f'{first_name} {last_name}'
         auth_url = f'{request.build_absolute_uri()}{ERCASPAY_SETTINGS['AUTH_REDIRECT_URL']}'
-        paymentReference = f"{uuid.uuid4().hex}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+        paymentReference = generate_payment_reference()
         response = ercaspay.initiate(amount, full_name, email, paymentReference, None, phone_number, auth_url, currency=ERCASPAY_SETTINGS['CURRENCY'])
-        # print(phone_number)
-        checkoutUrl = response.get('responseBody', {}).get('checkoutUrl')
-        ercaspay_reference = response.get('responseBody', {}).get('transactionReference')
+        body = response.get('responseBody') or {}
+        checkoutUrl = body.get('checkoutUrl')
+        ercaspay_reference = body.get('transactionReference')
         transaction = Transaction(full_name=full_name, email=email, amount=amount, phone_number=phone_number, payment_reference=paymentReference, ercaspay_reference=ercaspay_reference, currency=ERCASPAY_SETTINGS['CURRENCY'])
         if checkoutUrl is not None:
             transaction.save()
             return redirect(checkoutUrl)
-        return HttpResponse(response['explanation'], response['errorCode'])
+        return HttpResponse(response['explanation'], status=response['errorCode'])
     return render(request, "payment.html", {'website':website, 'dj': 'dj'})
 
 def auth_page(request):
@@ -53,9 +50,10 @@ def auth_page(request):
     if not trans_ref:
         raise Http404("Transaction not found")
     response = ercaspay.verify(trans_ref)
-    if response.get('errorCode'):
-        HttpResponse(response['explanation'], status=response['errorCode'])
-    status = response.get('responseBody', {}).get('status')
+    error_code = response.get('errorCode')
+    if error_code:
+        return HttpResponse(response['explanation'], status=error_code)
+    status = response_body(response, 'status')
     if status:
         try:
             transaction = Transaction.objects.get(ercaspay_reference=trans_ref)
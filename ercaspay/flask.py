@@ -1,7 +1,11 @@
-import secrets, uuid, datetime
+import os, hmac, hashlib, time
 from .main import Ercaspay
+from .utility import generate_payment_reference, response_body
 from typing import Callable, Dict
-from flask import Flask, render_template, Blueprint, session, request, abort, redirect
+from flask import Flask, render_template, Blueprint, request, abort, redirect
+
+# carries no routes, it only serves payment.html and style.css to the app
+blueprint = Blueprint('ercaspay', __name__, static_folder='static', template_folder='templates')
 
 class ErcaspayPage:
     """
@@ -11,6 +15,11 @@ class ErcaspayPage:
     with the Ercaspay API. It manages CSRF protection, transaction initiation, and the
     handling of callback authentication for completed transactions.
 
+    CSRF tokens are stateless: a timestamp signed with HMAC-SHA256 over the client IP, valid for
+    15 minutes. The key is read from `ERCASPAY_CSRF_SECRET`, falling back to `app.secret_key`; one of
+    them must be set. Because the token is bound to `request.remote_addr`, clients whose address changes
+    between loading and posting the form (e.g behind rotating proxies) get a 403.
+
     Attributes:
         ercaspay (Ercaspay): Instance of the Ercaspay API client.
         name (str): Name of the payment page.
@@ -22,7 +31,8 @@ class ErcaspayPage:
 
     def __init__(self, app: Flask, name: str, description: str = '', no_phone: bool = True,
                  redirect_url: str = '/', auth_redirect_url: str = '/ercaspay/auth', ercaspay_url: str = '/ercaspay', rsa_key: str = None,
-                 env: str = ".env", token: str = None, create_transaction: Callable[[Dict], None] = None, admin_url: str = "/", currency: str = "NGN"):
+                 env: str = ".env", token: str = None, create_transaction: Callable[[Dict], None] = None, admin_url: str = "/", currency: str = "NGN",
+                 auth_base_url: str = None):
         """
         Initializes the ErcaspayPage instance and registers it with the Flask app.
 
@@ -32,7 +42,7 @@ class ErcaspayPage:
             description (str): Description of the payment page.
             no_phone (bool): If True, phone number is not required for payment.
             redirect_url (str): URL to redirect users after successful authentication.
-            ercaspay_url (str): URL for Ercaspay payment Page.
+            ercaspay_url (str): URL for Ercaspay payment Page. Endpoint names of pages other than '/ercaspay' are prefixed from it.
             auth_redirect_url (str): URL for Ercaspay authentication callbacks.
             rsa_key (str): Path to RSA key file for secure communications.
             env (str): Environment file or environment variable for API configurations.
@@ -40,109 +50,117 @@ class ErcaspayPage:
             create_transaction (Callable): Callback function to handle transaction creation.
             admin_url (str): ercaspay admin page, default is $this.website.
             currency (str): collect payment in differents currency default (NGN).
+            auth_base_url (str): Public base URL of the site, e.g https://example.com. Defaults to the request host.
         """
         self.ercaspay = Ercaspay(rsa_key, env, token)
         self.name = name
         self.description = description
         self.no_phone = no_phone
+        self._website = {'name': name, 'description': description, 'no_phone': no_phone}
+        self._required_fields = ('first_name', 'last_name', 'email', 'amount') + (() if no_phone else ('phone_number',))
         self.redirect_url = redirect_url
         self.admin_url = admin_url
         self.currency = currency
         self.ercaspay_url = ercaspay_url
         self.auth_redirect_url = auth_redirect_url
+        self._auth_url = f"{auth_base_url.rstrip('/')}{auth_redirect_url}" if auth_base_url else None
         self.create_transaction = create_transaction
+        self._csrf_key = os.environ.get('ERCASPAY_CSRF_SECRET', '').encode() or None
         if app is not None:
             self.init_app(app)
 
+    def _csrf_signature(self, timestamp: str, client_ip: str) -> str:
+        return hmac.new(self._csrf_key, f"{timestamp}|{client_ip}".encode(), hashlib.sha256).hexdigest()[:32]
+
+    def _make_csrf_token(self, client_ip: str) -> str:
+        timestamp = str(int(time.time()))
+        return f"{timestamp}.{self._csrf_signature(timestamp, client_ip)}"
+
+    def _check_csrf_token(self, token: str, client_ip: str) -> bool:
+        timestamp, _, signature = (token or '').partition('.')
+        if not timestamp.isdigit() or time.time() - int(timestamp) > 900:
+            return False
+        # compared as bytes, compare_digest raises TypeError on non-ASCII str input
+        return hmac.compare_digest(signature.encode(), self._csrf_signature(timestamp, client_ip).encode())
+
     def init_app(self, app: Flask):
         """
         Initializes the Flask app with ErcaspayPage routes and configurations.
 
         Args:
             app (Flask): The Flask application instance to configure.
+
+        Raises:
+            RuntimeError: If neither `ERCASPAY_CSRF_SECRET` nor `app.secret_key` is set.
+        """
+        if self._csrf_key is None:
+            secret_key = app.secret_key
+            if not secret_key:
+                raise RuntimeError("ErcaspayPage needs a CSRF key: set ERCASPAY_CSRF_SECRET or app.secret_key.")
+            self._csrf_key = secret_key if isinstance(secret_key, bytes) else secret_key.encode()
+        if blueprint.name not in app.blueprints:
+            app.register_blueprint(blueprint, url_prefix='/ercaspay')
+        # the default page keeps the plain endpoint names, others are prefixed from their url
+        # so several pages can live on one app, e.g url_for('donate_payment_page') for '/donate'
+        prefix = '' if self.ercaspay_url == '/ercaspay' else self.ercaspay_url.strip('/').replace('/', '_') + '_'
+        app.add_url_rule(self.ercaspay_url, f'{prefix}payment_page', self.payment_page, methods=["GET", "POST"])
+        app.add_url_rule(self.auth_redirect_url, f'{prefix}auth_page', self.auth_page, methods=["GET"])
+        app.add_url_rule(f"{self.ercaspay_url}/admin", f'{prefix}admin_page', self.admin_page, methods=["GET"])
+
+    def payment_page(self):
         """
-        blueprint = Blueprint('ercaspay', __name__, static_folder='static', template_folder='templates')
-        app.register_blueprint(blueprint, url_prefix='/ercaspay')
-
-        @app.before_request
-        def generate_csrf_token():
-            """
-            Generates a CSRF token for session-based protection against CSRF attacks.
-            """
-            if "csrf_token" not in session:
-                session["csrf_token"] = secrets.token_hex(16)
-
-        @app.route(self.ercaspay_url, methods=["GET", "POST"])
-        def payment_page():
-            """
-            Displays the payment page and handles payment initiation requests.
-
-            Returns:
-                - On GET: Renders the payment page template.
-                - On POST: Initiates a payment request and redirects to the checkout URL.
-
-            Raises:
-                403: If CSRF token validation fails.
-                400: If required fields are missing.
-                HTTPException: For API-related errors.
-            """
-            website = {'name': self.name, 'description': self.description, 'no_phone': self.no_phone}
-            if request.method == "POST":
-                token = request.form.get("csrf_token")
-                valid = token and token == session.get("csrf_token")
-                session.pop("csrf_token", None)
-                if not valid:
-                    abort(403)
-                first_name = request.form.get('first_name')
-                last_name = request.form.get('last_name')
-                full_name = f'{first_name} {last_name}'
-                email = request.form.get('email')
-                amount = request.form.get('amount')
-                phone_number = None
-                if not website['no_phone']:
-                    phone_number = request.form.get('phone_number')
-                required_fields = ['first_name', 'last_name', 'email', 'amount']
-                if not website['no_phone']:
-                    required_fields.append('phone_number')
-                if not all(request.form.get(field) for field in required_fields):
-                    abort(400)
-                auth_url = f'{request.host_url}ercaspay/auth'
-                paymentReference = f"{uuid.uuid4().hex}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-                response = self.ercaspay.initiate(amount, full_name, email, paymentReference, None, phone_number, auth_url, currency=self.currency)
-                checkoutUrl = response.get('responseBody', {}).get('checkoutUrl')
-                if checkoutUrl is not None:
-                    return redirect(checkoutUrl)
-                abort(response['errorCode'], description=response['explanation'])
-            return render_template('payment.html', website=website, csrf_token=session["csrf_token"], dj=None)
-
-        @app.route(self.auth_redirect_url, methods=["GET"])
-        def auth_page():
-            """
-            Handles the authentication callback from Ercaspay.
-
-            Returns:
-                - Redirects to the configured redirect_url after successful transaction verification.
-
-            Raises:
-                400: If the transaction reference is missing.
-                HTTPException: For API-related errors.
-            """
-            transRef = request.args.get('transRef')
-            if transRef:
-                response = self.ercaspay.verify(transRef)
-                if response.get('errorCode'):
-                    abort(response['errorCode'], description=response['explanation'])
-                status = response.get('responseBody', {}).get('status')
-                # print(response)
-                if status:
-                    self.create_transaction(response)
-                return redirect(self.redirect_url)
-            abort(400)
-        
-        @app.route(f"{self.ercaspay_url}/admin", methods=["GET"])
-        def admin_page():
-            return redirect(self.admin_url)
-        
-        
+        Displays the payment page and handles payment initiation requests.
 
+        Returns:
+            - On GET: Renders the payment page template.
+            - On POST: Initiates a payment request and redirects to the checkout URL.
+
+        Raises:
+            403: If CSRF token validation fails.
+            400: If required fields are missing.
+            HTTPException: For API-related errors.
+        """
+        website = self._website
+        if request.method == "POST":
+            if not self._check_csrf_token(request.form.get("csrf_token"), request.remote_addr):
+                abort(403)
+            form = request.form
+            values = [form.get(field) for field in self._required_fields]
+            if not all(values):
+                abort(400)
+            first_name, last_name, email, amount = values[:4]
+            phone_number = values[4] if len(values) > 4 else None
+            full_name = f'{first_name} {last_name}'
+            auth_url = self._auth_url or f"{request.host_url.rstrip('/')}{self.auth_redirect_url}"
+            paymentReference = generate_payment_reference()
+            response = self.ercaspay.initiate(amount, full_name, email, paymentReference, None, phone_number, auth_url, currency=self.currency)
+            checkoutUrl = response_body(response, 'checkoutUrl')
+            if checkoutUrl is not None:
+                return redirect(checkoutUrl)
+            abort(response['errorCode'], description=response['explanation'])
+        return render_template('payment.html', website=website, csrf_token=self._make_csrf_token(request.remote_addr), dj=None)
+
+    def auth_page(self):
+        """
+        Handles the authentication callback from Ercaspay.
+
+        Returns:
+            - Redirects to the configured redirect_url after successful transaction verification.
+
+        Raises:
+            400: If the transaction reference is missing.
+            HTTPException: For API-related errors.
+        """
+        transRef = request.args.get('transRef')
+        if transRef:
+            response = self.ercaspay.verify(transRef)
+            error_code = response.get('errorCode')
+            if error_code:
+                abort(error_code, description=response['explanation'])
+            if response_body(response, 'status') and self.create_transaction:
+                self.create_transaction(response)
+            return redirect(self.redirect_url)
+        abort(400)
 
+    def admin_page(self):
+        return redirect(self.admin_url)
@@ -1,4 +1,8 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from .utility import *
+from .utility import _sessions, _find_env
 
 class Ercaspay:
     """
@@ -9,15 +13,133 @@ class Ercaspay:
     | rsa_key    | str    | None     | The RSA public key as a string or file path. If not provided, it attempts to load from environment variables. |
     | env               | str    | ".env"   | The environment file to use for configuration. Defaults to '.env'.                                 |
     | token             | str    | None     | The authorization token. If not provided, it will be retrieved based on the environment.           |
+    | session           | requests.Session | None | Session to send requests with. It is not modified, the client's headers are sent with each request.    |
 
     Learn more: https://github.com/devfemibadmus/ercaspay
     """
-    def __init__(self, rsa_key: str = None, env: str = None, token: str = None):
-        self.token = token or get_token(env)
+    def __init__(self, rsa_key: str = None, env: str = None, token: str = None, session=None):
+        # the parsed .env is kept so card payments can read its public key without touching os.environ
+        self._env = None if token else _find_env(env)
+        self.token = token or self._env.authorization or get_token(env)
         self.rsa_key = rsa_key
         self.gatewayReference = None
         self.transaction_ref = None
-        self.headers = {"Accept": "application/json", "Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+        self._make_transport(session)
+        self._urls = {
+            'cancel': f"{cancelUrl}/",
+            'verify': f"{verifyUrl}/",
+            'details': f"{detailsUrl}/",
+            'status': f"{statusUrl}/",
+            'ussd': f"{ussdUrl}/request-ussd-code/",
+            'bank': f"{bankUrl}/",
+            'resend_otp': f"{resendOptUrl}/",
+            'submit_otp': f"{submitOptUrl}/",
+        }
+        self._amount_cache = OrderedDict()
+        self._details_cache = OrderedDict()
+
+    def _make_transport(self, session=None):
+        # builds the HTTP session, AsyncErcaspay overrides this to build an httpx client instead
+        self._owns_session = session is None
+        if session is None:
+            self._session = new_session(self.headers)
+            self._request_headers = None
+        else:
+            # an injected session may be shared with other clients, so its headers are left alone
+            # and this client's headers go out with each request instead
+            self._session = session
+            _sessions.add(session)
+            self._request_headers = {"Accept": "application/json", "Content-Type": "application/json", **self.headers}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Closes the connection pool of the session this client created, an injected session is left open.
+        """
+        if self._owns_session:
+            self._session.close()
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key: str, value, maxsize: int = 1024):
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > maxsize:
+            cache.popitem(last=False)
+
+    def _remember_amount(self, transaction_ref: str, amount: float):
+        # keeps the last amounts seen so ussd() can skip the details round trip
+        if transaction_ref is None or amount is None:
+            return
+        self._remember(self._amount_cache, transaction_ref, amount)
+
+    def _cached_details(self, transaction_ref: str):
+        cached = self._details_cache.get(transaction_ref)
+        if cached is None:
+            return None
+        expires, response = cached
+        if expires is not None and time.monotonic() >= expires:
+            return None
+        return response
+
+    def _store_details(self, transaction_ref: str, response: dict) -> dict:
+        # finished transactions are kept until evicted, anything else only for 5 seconds
+        if not response.get('errorCode'):
+            expires = None if response_body(response, 'status') in terminal_statuses else time.monotonic() + 5
+            self._remember(self._details_cache, transaction_ref, (expires, response))
+        return response
+
+    def _initiate_payload(self, amount, customerName, customerEmail, paymentReference, paymentMethods,
+        customerPhoneNumber, redirectUrl, description, metadata, feeBearer, currency) -> dict:
+        payload = {
+            "amount": amount,
+            "paymentReference": paymentReference,
+            "paymentMethods": formatPaymentMethods(paymentMethods),
+            "customerName": customerName,
+            "currency": formatCurrency(currency),
+            "customerEmail": customerEmail,
+            "customerPhoneNumber": customerPhoneNumber,
+            "redirectUrl": redirectUrl,
+            "description": description,
+            "metadata": metadata,
+            "feeBearer": feeBearer,
+        }
+        # optional fields left as None are not sent at all
+        return {key: value for key, value in payload.items() if value is not None}
+
+    def _status_payload(self, reference: str, payment_method: str) -> dict:
+        payment_method = payment_method.strip().lower() if payment_method else default_payment_method
+        if payment_method not in valid_payment_methods:
+            payment_method = default_payment_method
+        return {
+            "payment_method": payment_method,
+            "reference": reference,
+        }
+
+    def _card_payload(self, cardDetails: dict, browserDetails: dict, ipAddress: str, transaction_ref: str) -> dict:
+        cipher = get_cipher(self.rsa_key, self._env.public_key if self._env else None)
+        return {
+            "payload": encrypt_card(cardDetails, cipher),
+            "transactionReference": transaction_ref,
+            "deviceDetails": {
+                "payerDeviceDto": {
+                    "device": {
+                        "browser": browserDetails.get('User-Agent'),
+                        "browserDetails": {
+                            "3DSecureChallengeWindowSize": browserDetails.get('3DSecureChallengeWindowSize', 'FULL_SCREEN'),
+                            "acceptHeaders": "application/json",
+                            **{field: browserDetails.get(field) for field in browser_detail_fields},
+                        },
+                        "ipAddress": ipAddress
+                    }
+                }
+            }
+        }
 
     def initiate(self, amount: float, customerName: str,
         customerEmail: str, paymentReference: str, paymentMethods: str = None,
@@ -44,22 +166,15 @@ class Ercaspay:
         Returns:
             dict: Response from the Ercaspay API after initiating the transaction.
         """
-        currency_code = formatCurrency(currency)
-        payload = {
-            "amount": amount,
-            "paymentReference": paymentReference,
-            "paymentMethods": formatPaymentMethods(paymentMethods),
-            "customerName": customerName,
-            "currency": currency_code,
-            "customerEmail": customerEmail,
-            "customerPhoneNumber": customerPhoneNumber,
-            "redirectUrl": redirectUrl,
-            "description": description,
-            "metadata": metadata,
-            "feeBearer": feeBearer,
-        }
-        transaction = send_payment_request(initiateUrl, payload=payload, headers=self.headers)
-        self.transaction_ref = transaction.get('responseBody', {}).get('transactionReference')
+        error = validate_initiate(amount, customerName, customerEmail, paymentReference)
+        if error:
+            self.transaction_ref = None # like a failed api call, so later calls do not reuse the previous transaction
+            return handle_error_msg(422, {'errorMessage': error})
+        payload = self._initiate_payload(amount, customerName, customerEmail, paymentReference, paymentMethods,
+            customerPhoneNumber, redirectUrl, description, metadata, feeBearer, currency)
+        transaction = send_payment_request(initiateUrl, payload=payload, headers=self._request_headers, session=self._session)
+        self.transaction_ref = response_body(transaction, 'transactionReference')
+        self._remember_amount(self.transaction_ref, amount)
         return transaction
 
     def cancel(self, transaction_ref: str = None) -> dict:
@@ -73,7 +188,8 @@ class Ercaspay:
             dict: Response from the Ercaspay API after attempting to cancel the transaction.
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
-        return send_payment_request(f"{cancelUrl}/{transaction_ref}", {}, self.headers)
+        self._details_cache.pop(transaction_ref, None)
+        return send_payment_request(self._urls['cancel'] + transaction_ref, {}, headers=self._request_headers, session=self._session)
 
     def verify(self, transaction_ref: str = None) -> dict:
         """
@@ -86,11 +202,14 @@ class Ercaspay:
             dict: Response containing transaction verification details from the API.
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
-        return send_payment_request(f"{verifyUrl}/{transaction_ref}", {}, self.headers)
+        response = send_payment_request(self._urls['verify'] + transaction_ref, {}, headers=self._request_headers, session=self._session)
+        self._remember_amount(transaction_ref, response_body(response, 'amount'))
+        return response
 
     def details(self, transaction_ref: str = None) -> dict:
         """
         Retrieves detailed information about a specific transaction.
+        Responses are cached per instance: for 5 seconds, or until evicted once the transaction is PAID, CANCELLED or FAILED.
 
         Args:
             transaction_ref (str): Unique reference for the transaction to retrieve details for. Defaults to the reference used in the initiated transaction (self).
@@ -99,7 +218,11 @@ class Ercaspay:
             dict: Detailed transaction information from the API.
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
-        return send_payment_request(f"{detailsUrl}/{transaction_ref}", {}, self.headers)
+        response = self._cached_details(transaction_ref)
+        if response is None:
+            response = self._store_details(transaction_ref, send_payment_request(self._urls['details'] + transaction_ref, {}, headers=self._request_headers, session=self._session))
+        self._remember_amount(transaction_ref, response_body(response, 'amount'))
+        return response
 
     def status(self, transaction_ref: str = None, reference: str = None, payment_method: str = None) -> dict:
         """
@@ -114,14 +237,58 @@ class Ercaspay:
             dict: Response containing the current status of the transaction.
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
-        payment_method = payment_method.strip().lower() if payment_method else "bank-transfer"
-        if payment_method not in valid_payment_methods:
-            payment_method = "bank-transfer"
-        payload = {
-            "payment_method": payment_method,
-            "reference": reference,
-        }
-        return send_payment_request(f"{statusUrl}/{transaction_ref}", payload, self.headers)
+        payload = self._status_payload(reference, payment_method)
+        return send_payment_request(self._urls['status'] + transaction_ref, payload, headers=self._request_headers, session=self._session)
+
+    def _batch(self, method, transaction_refs: list, max_workers: int) -> dict:
+        if max_workers < 1:
+            raise ValueError("max_workers must be greater than 0")
+        transaction_refs = list(dict.fromkeys(transaction_refs))
+        if not transaction_refs:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(transaction_refs))) as executor:
+            return dict(zip(transaction_refs, executor.map(method, transaction_refs)))
+
+    def verify_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        """
+        Verifies many transactions concurrently, e.g for reconciliation jobs.
+        All workers share the pooled session, so keep `max_workers` at or below its pool size (20);
+        more workers only hold more responses in memory while waiting for a connection.
+
+        Args:
+            transaction_refs (list): Transaction references to verify.
+            max_workers (int): Number of requests in flight at once. Defaults to 16.
+
+        Returns:
+            dict: Mapping of each transaction reference to its `verify` response.
+        """
+        return self._batch(self.verify, transaction_refs, max_workers)
+
+    def details_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        """
+        Retrieves details for many transactions concurrently. See `verify_batch`.
+
+        Args:
+            transaction_refs (list): Transaction references to look up.
+            max_workers (int): Number of requests in flight at once. Defaults to 16.
+
+        Returns:
+            dict: Mapping of each transaction reference to its `details` response.
+        """
+        return self._batch(self.details, transaction_refs, max_workers)
+
+    def status_batch(self, transaction_refs: list, max_workers: int = 16) -> dict:
+        """
+        Checks the status of many transactions concurrently. See `verify_batch`.
+
+        Args:
+            transaction_refs (list): Transaction references to check.
+            max_workers (int): Number of requests in flight at once. Defaults to 16.
+
+        Returns:
+            dict: Mapping of each transaction reference to its `status` response.
+        """
+        return self._batch(self.status, transaction_refs, max_workers)
 
     def ussd(self, bank_name: str, transaction_ref: str = None, amount: float=None) -> dict:
         """
@@ -139,16 +306,18 @@ class Ercaspay:
         # if bank_name not in valid_bank_names:
         #     return handle_error_msg(422, {'errorMessage': 'The selected bank name is invalid.'})
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
+        if amount is None:
+            amount = self._amount_cache.get(transaction_ref)
         if amount is None:
             transaction = self.details(transaction_ref)
-            amount = transaction.get('responseBody', {}).get('amount')
+            amount = response_body(transaction, 'amount')
             if not amount:
                 return transaction
         payload = {
             "amount": amount,
             "bank_name": bank_name,
         }
-        return send_payment_request(f"{ussdUrl}/request-ussd-code/{transaction_ref}", payload, self.headers)
+        return send_payment_request(self._urls['ussd'] + transaction_ref, payload, headers=self._request_headers, session=self._session)
 
     def supported_bank_list(self) -> dict:
         """
@@ -179,7 +348,7 @@ class Ercaspay:
             dict: Detailed transaction information from the API.
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
-        return send_payment_request(f"{bankUrl}/{transaction_ref}", {}, self.headers)
+        return send_payment_request(self._urls['bank'] + transaction_ref, {}, headers=self._request_headers, session=self._session)
 
     def card(self, cardDetails: dict, browserDetails: dict, ipAddress: str = None, transaction_ref: str = None) -> dict:
         """
@@ -210,32 +379,10 @@ class Ercaspay:
             - dict:
                 Detailed transaction information from the API, including the result of the transaction processing.
         """
-        self.rsa_key = get_rsa(self.rsa_key)
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
-        payload = {
-            "payload": encrypt_card(cardDetails, self.rsa_key),
-            "transactionReference": transaction_ref,
-            "deviceDetails": {
-                "payerDeviceDto": {
-                    "device": {
-                        "browser": browserDetails.get('User-Agent'),
-                        "browserDetails": {
-                            "3DSecureChallengeWindowSize": browserDetails.get('3DSecureChallengeWindowSize', 'FULL_SCREEN'),
-                            "acceptHeaders": "application/json",
-                            "colorDepth": browserDetails.get('colorDepth'),
-                            "javaEnabled": browserDetails.get('javaEnabled'),
-                            "language": browserDetails.get('language'),
-                            "screenHeight": browserDetails.get('screenHeight'),
-                            "screenWidth": browserDetails.get('screenWidth'),
-                            "timeZone": browserDetails.get('timeZone')
-                        },
-                        "ipAddress": ipAddress
-                    }
-                }
-            }
-        }
-        response = send_payment_request(cardUrl, payload, self.headers)
-        self.gatewayReference = response.get('responseBody', {}).get('gatewayReference')
+        payload = self._card_payload(cardDetails, browserDetails, ipAddress, transaction_ref)
+        response = send_payment_request(cardUrl, payload, headers=self._request_headers, session=self._session)
+        self.gatewayReference = response_body(response, 'gatewayReference')
         return response
 
     def resend_otp(self, transaction_ref: str = None, gatewayReference: str = None) -> dict:
@@ -251,7 +398,7 @@ class Ercaspay:
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
         gatewayReference = get_gateway_ref(gatewayReference, self.gatewayReference)
-        return send_payment_request(f"{resendOptUrl}/{transaction_ref}", {'gatewayReference': gatewayReference, 'amount': '100050'}, self.headers)
+        return send_payment_request(self._urls['resend_otp'] + transaction_ref, {'gatewayReference': gatewayReference, 'amount': '100050'}, headers=self._request_headers, session=self._session)
 
     def submit_otp(self, otp: str, transaction_ref: str = None, gatewayReference: str = None) -> dict:
         """
@@ -267,7 +414,7 @@ class Ercaspay:
         """
         transaction_ref = get_transaction_ref(transaction_ref, self.transaction_ref)
         gatewayReference = get_gateway_ref(gatewayReference, self.gatewayReference)
-        return send_payment_request(f"{submitOptUrl}/{transaction_ref}", {'gatewayReference': gatewayReference, 'otp': otp}, self.headers)
+        return send_payment_request(self._urls['submit_otp'] + transaction_ref, {'gatewayReference': gatewayReference, 'otp': otp}, headers=self._request_headers, session=self._session)
 
 
 
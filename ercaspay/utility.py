@@ -11,28 +11,46 @@ It includes functionality for:
 
 Constants:
     - `valid_payment_methods`: Default payment methods available.
+    - `all_payment_methods`: Comma separated payment methods sent when none is given.
+    - `default_payment_method`: Payment method used when checking a transaction status.
+    - `payment_method_aliases`: Common spellings of each payment method mapped to its api name.
+    - `error_codes`: HTTP status codes and the messages returned for them.
+    - `currency_map`: Supported currency names and their codes.
+    - `currency_codes`: The supported currency codes themselves.
+    - `browser_detail_fields`: Browser details forwarded unchanged with a card payment.
+    - `terminal_statuses`: Transaction statuses that will not change again.
+    - `logger`: The 'ercaspay' logger, responses are logged at DEBUG level.
+    - `request_timeout`: Connect and read timeouts for every API request.
+    - `success_codes`: HTTP status codes treated as a successful response.
     - `baseUrl`: Base URL for the payment API.
     - Various endpoint URLs for specific payment actions (`bankUrl`, `verifyUrl`, etc.).
 
 Functions:
-    - `load_env_vars(env_file_path)`: Loads environment variables from a specified file.
+    - `load_env_vars(env_file_path)`: Loads (and caches) environment variables from a specified file.
     - `get_token(env=None)`: Retrieves the authorization token from the environment.
     - `formatCurrency(currency_name)`: Converts currency names to their corresponding codes.
     - `formatPaymentMethods(payment_method)`: Normalizes and validates payment methods.
+    - `validate_initiate(amount, customerName, customerEmail, paymentReference)`: Checks required initiate fields before sending.
     - `handle_error_msg(status_code, resp)`: Maps status codes to user-friendly error messages.
-    - `send_payment_request(url, payload, headers)`: Sends payment requests and handles errors.
-    - `get_rsa(key_input)`: Loads an RSA public key from input or environment variables.
-    - `encrypt_card(card_details, rsa_public_key)`: Encrypts card details using RSA encryption.
+    - `new_session(headers)`: Creates a pooled HTTP session with default headers.
+    - `get_session()`: Returns the shared HTTP session used for unauthenticated API calls.
+    - `set_session(session)`: Replaces the shared HTTP session.
+    - `send_payment_request(url, payload, headers, session)`: Sends payment requests and handles errors.
+    - `get_rsa(key_input, public_key)`: Loads an RSA public key from input or environment variables.
+    - `get_cipher(key_input, public_key)`: Returns a PKCS#1 v1.5 cipher for the loaded RSA public key.
+    - `encrypt_card(card_details, cipher)`: Encrypts card details using RSA encryption.
+    - `response_body(response, key, default)`: Reads a field from an API response body.
     - `get_transaction_ref(transaction_ref, self_transaction_ref)`: Resolves transaction references.
+    - `generate_payment_reference()`: Creates a unique payment reference for a new transaction.
     - `supported_banks()`: Retrieves a list of supported banks for USSD transfers.
     - `support_bank(bank_name)`: Checks if a specified bank is supported.
 
 Dependencies:
     - `os`: For environment variable management.
-    - `requests`: For sending HTTP requests.
-    - `json`: For handling JSON data.
+    - `requests`: For sending HTTP requests (imported when the first session is created).
+    - `json`: For handling JSON data (`orjson` is used instead when installed).
     - `base64`: For encoding encrypted card details.
-    - `Crypto.PublicKey.RSA` and `Crypto.Cipher.PKCS1_v1_5`: For RSA key management and encryption.
+    - `Crypto.PublicKey.RSA` and `Crypto.Cipher.PKCS1_v1_5`: For RSA key management and encryption (imported on first card payment).
 
 Usage:
     Import this module into your application to interact with the ERCASPAY API. 
@@ -43,11 +61,62 @@ Usage:
         response = send_payment_request(bankUrl, {}, {"Authorization": token})
 """
 
-import os, requests, json, base64
-from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_v1_5
-
-valid_payment_methods = ['card', 'bank-transfer', 'qrcode', 'ussd'] # not effective only use as default if user pass none and also use in checking transaction status(not validated)
+import os, json, base64, time, logging, itertools
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from weakref import WeakSet
+
+if TYPE_CHECKING:
+    import requests
+
+try:
+    import orjson
+except ImportError:  # optional, pip install ercaspay[fast]
+    orjson = None
+
+_payment_method_order = ('card', 'bank-transfer', 'qrcode', 'ussd') # the one list of methods, add new ones here
+valid_payment_methods = frozenset(_payment_method_order) # not effective only use as default if user pass none and also use in checking transaction status(not validated)
+all_payment_methods = ', '.join(_payment_method_order) # sent when the user pass none, built from the tuple since a frozenset has no order
+default_payment_method = 'bank-transfer'
+payment_method_aliases = {
+    variant: method
+    for method in valid_payment_methods
+    for spelling in (method, method.replace('-', ' '), method.replace('-', '_'), method.replace('-', ''))
+    for variant in (spelling, spelling.upper(), spelling.title())
+} # common spellings mapped straight to the api name, e.g 'Bank Transfer' -> 'bank-transfer'
+browser_detail_fields = ('colorDepth', 'javaEnabled', 'language', 'screenHeight', 'screenWidth', 'timeZone') # copied as is into the card deviceDetails
+terminal_statuses = frozenset({'PAID', 'CANCELLED', 'FAILED'}) # a transaction in one of these will not change again
+
+error_codes = {
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    408: 'Request Timeout',
+    409: 'Conflict',
+    410: 'Gone',
+    422: 'Unprocessable',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    502: 'Bad Gateway',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+    507: 'Insufficient Storage',
+    511: 'Network Authentication Required'
+}
+
+currency_map = {
+    'ngn': 'NGN',
+    'usd': 'USD',
+    'cad': 'CAD',
+    'gbp': 'GBP',
+    'gh₵': 'GH₵',
+    'gmd': 'GMD',
+    'ksh': 'Ksh',
+    'euro': 'EURO'
+}
+currency_codes = frozenset(currency_map.values())
 
 # valid_bank_names = ["access", "alat", "ecobank", "fcmb", "fidelity", "firstbank", "gtbank", "heritage", "keystone", "polaris", "stanbic", "sterling", "uba", "union", "unity", "wema", "zenith"]
 
@@ -64,23 +133,110 @@ cancelUrl = f"{baseUrl}/payment/cancel"
 statusUrl = f"{baseUrl}/payment/status"
 ussdUrl = f"{baseUrl}/payment/ussd"
 
+
+_sessions = WeakSet()
+
+
+def _drop_inherited_connections():
+    # a forked worker must not share the parent's sockets, pools refill on the next request.
+    # session.close() would take the pool locks, which another parent thread may have held at fork time,
+    # so the old pools are replaced with fresh ones without touching them
+    for session in list(_sessions):
+        for adapter in session.adapters.values():
+            if hasattr(adapter, 'init_poolmanager'):
+                adapter.init_poolmanager(adapter._pool_connections, adapter._pool_maxsize, block=adapter._pool_block)
+                adapter.proxy_manager = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_drop_inherited_connections)
+
+
+def new_session(headers: dict = None) -> "requests.Session":
+    """
+    Creates a pooled HTTP session with the JSON headers (and any extra `headers`) set once on the session.
+    Its connections are dropped in a forked child process (e.g gunicorn workers) so each worker opens its own.
+
+    Args:
+        headers (dict): Extra headers sent with every request, e.g the Authorization header.
+
+    Returns:
+        requests.Session: A session that keeps connections alive and retries on 502/503/504.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers.update({"Accept": "application/json", "Content-Type": "application/json", **(headers or {})})
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)))
+    _sessions.add(session)
+    return session
+
+
+logger = logging.getLogger('ercaspay')
+
+# shared pooled session for unauthenticated calls so the TCP/TLS connection to the api stays warm between requests,
+# created on first use so importing the package does not pull in requests
+_session = None
+request_timeout = (3.05, 30) # (connect, read) seconds
+success_codes = frozenset({200, 201})
+
+class _Env:
+    # parsed .env file, the two ercaspay keys are pulled out once so lookups are plain attribute reads
+    __slots__ = ('values', 'authorization', 'public_key')
+
+    def __init__(self, values: dict):
+        self.values = values
+        self.authorization = values.get('ERCASPAY_AUTHORIZATION')
+        self.public_key = values.get('ERCASPAY_PUBLIC_KEY')
+
+
+_env_cache = {}
+
+
+def _load_env(env_file_path) -> _Env:
+    try:
+        mtime = os.stat(env_file_path).st_mtime_ns
+    except OSError:
+        raise FileNotFoundError(f"Environment file '{env_file_path}' not found.")
+    # one entry per file, replaced when the file changes so edits do not pile up old versions
+    path = os.path.abspath(env_file_path)
+    cached = _env_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        env = cached[1]
+    else:
+        env_vars = {}
+        with open(env_file_path, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+                key, sep, value = line.partition('=')
+                if sep:
+                    env_vars[key] = value
+        # exported once per file version, get_rsa still falls back to os.environ
+        os.environ.update(env_vars)
+        env = _Env(env_vars)
+        _env_cache[path] = (mtime, env)
+    return env
+
+
 def load_env_vars(env_file_path):
     """
     Loads environment variables from a specified file.
+    The parsed file is cached on its path and mtime, so it is only read again after it changes.
     
     Args:
         env_file_path (str): Path to the environment file.
+
+    Returns:
+        dict: The variables found in the file.
     
     Raises:
         FileNotFoundError: If the environment file is not found.
     """
-    if not os.path.exists(env_file_path):
-        raise FileNotFoundError(f"Environment file '{env_file_path}' not found.")
-    with open(env_file_path, 'r') as file:
-        for line in file:
-            if line.strip() and not line.startswith('#'):
-                key, value = line.strip().split('=', 1)
-                os.environ[key] = value
+    return _load_env(env_file_path).values
 
 
 def get_token(env: str = None):
@@ -97,23 +253,28 @@ def get_token(env: str = None):
         FileNotFoundError: If the environment file is not found.
         ValueError: If no 'Authorization' token is found.
     """
+    token = _find_env(env).authorization or os.environ.get('ERCASPAY_AUTHORIZATION')
+    if not token:
+        raise ValueError(f"No 'Authorization' found in {env or '.env'}")
+    return token
+
+
+def _find_env(env: str = None) -> _Env:
+    # resolves the env path the way get_token always has, Ercaspay keeps the result
     if not env:
         if not os.path.exists('.env'):
             raise FileNotFoundError("Environment path not passed and default file '.env' not found.")
         env = '.env'
     elif not os.path.exists(env):
         raise FileNotFoundError(f"Environment file '{env}' not found.")
-    
-    load_env_vars(env)
-    token = os.environ.get('ERCASPAY_AUTHORIZATION')
-    if not token:
-        raise ValueError(f"No 'Authorization' found in {env}")
-    return token
+    return _load_env(env)
 
 
+@lru_cache(maxsize=32)
 def formatCurrency(currency_name: str = None):
     """
     Convert the currency name to the corresponding currency code.
+    Results are memoised, see `formatCurrency.cache_info()`.
         
     Args:
         currency_name (str): The currency name (e.g., 'USD', 'NGN').
@@ -121,16 +282,8 @@ def formatCurrency(currency_name: str = None):
     Returns:
         str: The corresponding currency code if valid, else raises a ValueError.
     """
-    currency_map = {
-        'ngn': 'NGN',
-        'usd': 'USD',
-        'cad': 'CAD',
-        'gbp': 'GBP',
-        'gh₵': 'GH₵',
-        'gmd': 'GMD',
-        'ksh': 'Ksh',
-        'euro': 'EURO'
-    }
+    if currency_name in currency_codes:
+        return currency_name
 
     currency_name = currency_name.lower()
         
@@ -140,9 +293,11 @@ def formatCurrency(currency_name: str = None):
     return currency_map[currency_name]
 
 
+@lru_cache(maxsize=32)
 def formatPaymentMethods(payment_method: str) -> str:
     """
     Normalizes and validates payment method input.
+    Results are memoised, see `formatPaymentMethods.cache_info()`.
 
     Args:
         payment_method (str): The payment method entered by the user.
@@ -151,81 +306,150 @@ def formatPaymentMethods(payment_method: str) -> str:
         str: The standardized payment method (e.g., 'card', 'bank-transfer', 'qrcode', 'ussd').
         None: If the payment method is not valid.
     """
+    if payment_method in payment_method_aliases:
+        return payment_method_aliases[payment_method]
     if payment_method:
         payment_method = payment_method.strip().lower()
         if payment_method in valid_payment_methods:
             return payment_method
         if 'bank' in payment_method and 'transfer' in payment_method:
             return 'bank-transfer'
-    return ', '.join(valid_payment_methods)
+    return all_payment_methods
+
 
+def validate_initiate(amount, customerName: str, customerEmail: str, paymentReference: str) -> str:
+    """
+    Checks the required initiate fields locally so obviously bad input does not cost a round trip.
 
-def handle_error_msg(status_code: str, resp: dict) -> dict:
+    Returns:
+        str: The error explanation, or None if the fields look valid.
+    """
+    try:
+        if float(amount) <= 0:
+            return 'The amount must be greater than zero.'
+    except (TypeError, ValueError):
+        return 'The amount must be a number.'
+    if not customerName:
+        return 'The customer name field is required.'
+    if not customerEmail or '@' not in customerEmail:
+        return 'The customer email must be a valid email address.'
+    if not paymentReference:
+        return 'The payment reference field is required.'
+    return None
+
+
+def handle_error_msg(status_code: int, resp: dict) -> dict:
     """
     Maps status codes to their corresponding messages and explanations.
     
     Args:
-        status_code (str): The status code received from the payment API response.
+        status_code (int): The HTTP status code received from the payment API response.
         
     Returns:
         dict: A dictionary with errorCode as the key and the error message with explanation as the value.
     """
-    error_codes = {
-        '400': 'Bad Request',
-        '401': 'Unauthorized',
-        '403': 'Forbidden',
-        '404': 'Not Found',
-        '405': 'Method Not Allowed',
-        '408': 'Request Timeout',
-        '409': 'Conflict',
-        '410': 'Gone',
-        '422': 'Unprocessable',
-        '429': 'Too Many Requests',
-        '500': 'Internal Server Error',
-        '504': 'Gateway Timeout',
-        '507': 'Insufficient Storage',
-        '511': 'Network Authentication Required'
-    }
-    
     return { 'errorCode': status_code, 'message': error_codes.get(status_code, 'Unknown error'), 'explanation': resp.get('errorMessage', 'Something went wrong on our end.') }
 
 
-def send_payment_request(url: str, payload: dict, headers: dict) -> dict:
+def get_session() -> "requests.Session":
+    """
+    Returns the shared HTTP session used for unauthenticated requests to the payment API.
+
+    Returns:
+        requests.Session: The pooled session (keep-alive, retries on 502/503/504).
+    """
+    global _session
+    if _session is None:
+        _session = new_session()
+    return _session
+
+
+def set_session(session: "requests.Session"):
+    """
+    Replaces the shared HTTP session, e.g with one that has a proxy or custom adapters mounted.
+
+    Args:
+        session (requests.Session): The session to use for unauthenticated requests.
+    """
+    global _session
+    _sessions.add(session)
+    _session = session
+
+
+def send_payment_request(url: str, payload: dict, headers: dict = None, session: "requests.Session" = None) -> dict:
     """
     Sends a payment request to the specified URL and handles any potential errors.
 
     Args:
         url (str): The endpoint to send the request to.
         payload (dict): The data to be sent in the POST request.
-        headers (dict): The headers to include in the request.
+        headers (dict): Extra headers for this request only. Prefer setting them on the session.
+        session (requests.Session): Session to send with. Defaults to the shared session.
         
     Returns:
         dict: The response from the server in JSON format or an error message with code and explanation.
+              Transport failures (timeouts, connection errors) are reported with errorCode 503.
     """
+    import requests
+
+    session = session or get_session()
     try:
         if not payload:
-            response = requests.get(url, headers=headers)
+            response = session.get(url, headers=headers, timeout=request_timeout)
         else:
-            response = requests.post(url, json=payload, headers=headers)
-        # print(response.json())
-        # print(response.status_code)
-        if response.status_code in [200, 201]:
-            return response.json()
-        return handle_error_msg(str(response.status_code), response.json())
+            response = session.post(url, data=_dumps(payload), headers=headers, timeout=request_timeout)
+        try:
+            body = _loads(response.content)
+        except ValueError:
+            body = {} # e.g an html page from a proxy on 502
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s -> %s %r", response.request.method, url, response.status_code, body)
+        if response.status_code in success_codes:
+            return body
+        return handle_error_msg(response.status_code, body)
     except requests.exceptions.RequestException as e:
-        return {'errorCode': 'RequestException', 'message': 'Error sending request', 'explanation': str(e)}
+        # an int code like any other error so views can hand it to abort()/HttpResponse(status=...)
+        return {'errorCode': 503, 'message': 'Error sending request', 'explanation': str(e)}
+
+
+def _dumps(payload: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
 
 
-def get_rsa(key_input: str = None):
+def _loads(content: bytes):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+@lru_cache(maxsize=8)
+def _import_rsa(pem: bytes):
+    # pycryptodome is only needed for card payments, so it is not imported with the module
+    from Crypto.PublicKey import RSA
+    return RSA.import_key(pem)
+
+
+@lru_cache(maxsize=8)
+def _load_rsa_file(path: str, mtime: float):
+    # mtime is part of the cache key so a rotated key file is picked up again
+    with open(path, "rb") as key_file:
+        return _import_rsa(key_file.read())
+
+
+def get_rsa(key_input: str = None, public_key: str = None):
     """
     Loads and returns an RSA public key based on the provided input.
+    Parsed keys are cached, keyed on the PEM bytes (or the file path and its mtime).
 
     Args:
         key_input (str or None): The input for the RSA key. It can be:
             - A string containing the RSA public key.
             - A file path to the public key file.
-            - None, in which case the function will attempt to load the key from the 
-              environment variable `ERCASPAY_PUBLIC_KEY`.
+            - None, in which case the function will use `public_key` or attempt to load
+              the key from the environment variable `ERCASPAY_PUBLIC_KEY`.
+        public_key (str or None): The key body as written in a .env file's `ERCASPAY_PUBLIC_KEY`.
 
     Returns:
         RSA key object: The RSA public key object.
@@ -236,32 +460,58 @@ def get_rsa(key_input: str = None):
     """
     try:
         if key_input is None:
-            rsa_public_key = os.environ.get('ERCASPAY_PUBLIC_KEY')
+            rsa_public_key = public_key or os.environ.get('ERCASPAY_PUBLIC_KEY')
             if rsa_public_key:
                 rsa_public_key = f"-----BEGIN PUBLIC KEY-----\n{rsa_public_key.strip()}\n-----END PUBLIC KEY-----"
-                return RSA.import_key(rsa_public_key)
+                return _import_rsa(rsa_public_key.encode("utf-8"))
             else:
                 raise ValueError("No RSA key provided and environment variable is missing.")
 
         if os.path.isfile(key_input):
-            with open(key_input, "rb") as key_file:
-                return RSA.import_key(key_file.read())
+            return _load_rsa_file(os.path.abspath(key_input), os.path.getmtime(key_input))
         else:
             raise ValueError(f"The provided path to the RSA key does not exist or is invalid: {os.path.abspath(key_input)}")
         
-        return RSA.import_key(key_input)
+        return _import_rsa(key_input.encode("utf-8"))
 
     except Exception as e:
         raise ValueError(f"Failed to load RSA key: {str(e)}")
 
 
-def encrypt_card(card_details: dict, rsa_public_key: str) -> str:
+def get_cipher(key_input: str = None, public_key: str = None):
+    """
+    Builds the PKCS#1 v1.5 cipher used to encrypt card details.
+
+    Args:
+        key_input (str or None): Same as `get_rsa`.
+        public_key (str or None): Same as `get_rsa`.
+
+    Returns:
+        PKCS1_v1_5 cipher: Cipher ready for `encrypt_card`.
+    """
+    from Crypto.Cipher import PKCS1_v1_5
+    return PKCS1_v1_5.new(get_rsa(key_input, public_key))
+
+
+def encrypt_card(card_details: dict, cipher) -> str:
     card_json = json.dumps(card_details).encode("utf-8")
-    cipher = PKCS1_v1_5.new(rsa_public_key)
     encrypted = cipher.encrypt(card_json)
     return base64.b64encode(encrypted).decode("utf-8")
 
 
+def response_body(response: dict, key: str, default=None):
+    """
+    Reads a field from the `responseBody` of an API response.
+
+    Args:
+        response (dict): Response returned by `send_payment_request`.
+        key (str): Field to read, e.g 'status'.
+        default: Value returned when the body or the field is missing (error responses have no body).
+    """
+    body = response.get('responseBody')
+    return body.get(key, default) if body else default
+
+
 def get_transaction_ref(transaction_ref: str, self_transaction_ref: str):
     if transaction_ref is None:
         if self_transaction_ref is None:
@@ -270,6 +520,21 @@ def get_transaction_ref(transaction_ref: str, self_transaction_ref: str):
     return transaction_ref
 
 
+_reference_prefix = os.urandom(8).hex()
+_reference_counter = itertools.count()
+
+
+def generate_payment_reference() -> str:
+    """
+    Creates a unique payment reference for a new transaction.
+    A random prefix drawn once per process, the process id and a counter keep it unique without a syscall per call.
+
+    Returns:
+        str: The prefix, pid and counter in hex followed by the unix timestamp, e.g '9f1c...00002a1f3_1734200836'.
+    """
+    return f"{_reference_prefix}{os.getpid():08x}{next(_reference_counter):x}_{int(time.time())}"
+
+
 def get_gateway_ref(gatewayReference: str, self_gatewayReference: str):
     if gatewayReference is None:
         if self_gatewayReference is None:
@@ -278,14 +543,31 @@ def get_gateway_ref(gatewayReference: str, self_gatewayReference: str):
     return gatewayReference
 
 
+_bank_list_cache = {'expires': 0.0, 'response': None}
+
+
+def _cached_bank_list():
+    if _bank_list_cache['response'] is not None and time.monotonic() < _bank_list_cache['expires']:
+        return _bank_list_cache['response']
+    return None
+
+
+def _store_bank_list(response: dict) -> dict:
+    if not response.get('errorCode'):
+        _bank_list_cache['response'] = response
+        _bank_list_cache['expires'] = time.monotonic() + 3600
+    return response
+
+
 def supported_banks() -> dict:
     """
     Get all the supported banks for USSD transfer
+    The list barely changes, so a successful response is reused for an hour.
 
     Returns:
         dict: Response containing the USSD code and related details.
     """
-    return send_payment_request(f"{ussdUrl}/supported-banks", {}, {})
+    return _cached_bank_list() or _store_bank_list(send_payment_request(f"{ussdUrl}/supported-banks", {}))
 
 
 def support_bank(bank_name: str) -> bool:
@@ -299,6 +581,6 @@ def support_bank(bank_name: str) -> bool:
         bool: Response True or False.
     """
     supported_bank_list = supported_banks()
-    return bank_name.lower() in [bank.lower() for bank in supported_bank_list.get('responseBody', [])]
+    return bank_name.lower() in {bank.lower() for bank in supported_bank_list.get('responseBody', [])}
 
 
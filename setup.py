@@ -24,6 +24,10 @@ setup(
         'requests',
         'pycryptodome',
     ],
+    extras_require={
+        'fast': ['orjson'],
+        'async': ['httpx[http2]'],
+    },
     entry_points={
         "console_scripts": [
             "ercaspay=ercaspay:function",